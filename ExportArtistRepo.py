@@ -1,6 +1,7 @@
 from oauth2client.service_account import ServiceAccountCredentials
-import os, csv, re, gspread
-from collections import defaultdict
+import os, csv, json, unicodedata, gspread
+from collections import defaultdict, Counter
+from itertools import zip_longest
 
 # Set up the credentials
 scope = ['https://spreadsheets.google.com/feeds',
@@ -13,6 +14,119 @@ aum_sheet_url = "https://docs.google.com/spreadsheets/d/1j8jRlbBJi_6GREbj9vhlUvv
 # Prompt user for the path to the JSON key file
 json_keyfile_path = "C:\\Aum.Music\\credentials.json"
 
+# Local copy of the "IG Artist" lookup index, rebuilt whenever the Aum sheet changes
+ig_index_cache_file = "aum_ig_index.json"
+
+# Fall back to a trigram similarity search for names without an exact match
+fuzzy_match = True
+fuzzy_min_similarity = 0.6
+fuzzy_min_length = 4  # Shorter names are too ambiguous to guess
+
+
+def normalize_exact(name):
+    return name.strip().lower()
+
+
+def normalize_folded(name):
+    # Unicode-aware: drop accents and niqqud, casefold, collapse whitespace
+    decomposed = unicodedata.normalize('NFKD', name)
+    without_marks = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(without_marks.casefold().split())
+
+
+def normalize_stripped(name):
+    # Letters and digits of any script only, so Hebrew names are kept instead of stripped to nothing
+    return ''.join(ch for ch in normalize_folded(name) if ch.isalnum())
+
+
+# Lookup order, from the strictest normalization to the loosest
+normalizers = [('exact', normalize_exact), ('folded', normalize_folded), ('stripped', normalize_stripped)]
+
+
+def get_sheet_modified_time(spreadsheet):
+    # Drive's modifiedTime of the spreadsheet, or None if this gspread version can't tell
+    try:
+        return spreadsheet.lastUpdateTime
+    except Exception:
+        return None
+
+
+def build_ig_index(names, handles):
+    index = {level: {} for level, _ in normalizers}
+    for name, handle in zip_longest(names, handles, fillvalue=''):
+        for level, normalize in normalizers:
+            key = normalize(name)
+            if key:
+                index[level].setdefault(key, handle.strip())  # First row wins, like list.index did
+    return index
+
+
+def load_ig_index(spreadsheet, worksheet):
+    sheet_modified = get_sheet_modified_time(spreadsheet)
+    if sheet_modified and os.path.exists(ig_index_cache_file):
+        try:
+            with open(ig_index_cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('sheet_id') == spreadsheet.id and cached.get('sheet_modified') == sheet_modified:
+                return cached['index']
+        except Exception as e:
+            print("Error reading IG index cache, rebuilding it:", str(e))
+
+    # Fetch the name and IG handle columns in a single call (header row excluded)
+    name_range, handle_range = worksheet.batch_get(['A2:A', 'D2:D'], major_dimension='COLUMNS')
+    names = name_range[0] if name_range else []
+    handles = handle_range[0] if handle_range else []
+    index = build_ig_index(names, handles)
+
+    if sheet_modified:
+        tmp_file = ig_index_cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'sheet_id': spreadsheet.id, 'sheet_modified': sheet_modified, 'index': index}, f,
+                      ensure_ascii=False)
+        os.replace(tmp_file, ig_index_cache_file)
+    return index
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_trigram_index(keys):
+    trigram_index = defaultdict(set)
+    for key in keys:
+        for gram in trigrams(key):
+            trigram_index[gram].add(key)
+    return trigram_index
+
+
+def fuzzy_lookup(key, trigram_index):
+    # Best Jaccard similarity over trigrams among the keys sharing at least one trigram
+    grams = trigrams(key)
+    shared = Counter(candidate for gram in grams for candidate in trigram_index.get(gram, ()))
+    best_key, best_score = None, 0.0
+    for candidate, count in shared.items():
+        score = count / (len(grams) + len(trigrams(candidate)) - count)
+        if score > best_score:
+            best_key, best_score = candidate, score
+    if best_score >= fuzzy_min_similarity:
+        return best_key
+    return None
+
+
+def find_ig_artist(name, ig_index, trigram_index):
+    # Returns (IG handle, matched name key or None if the match was exact)
+    for level, normalize in normalizers:
+        key = normalize(name)
+        if key in ig_index[level]:
+            return ig_index[level][key], None
+    key = normalize_stripped(name)
+    if trigram_index is not None and len(key) >= fuzzy_min_length:
+        match = fuzzy_lookup(key, trigram_index)
+        if match:
+            return ig_index['stripped'][match], match
+    return None, None
+
 # Set up the credentials using the provided JSON key file path
 creds = ServiceAccountCredentials.from_json_keyfile_name(json_keyfile_path, scope)
 client = gspread.authorize(creds)
@@ -33,10 +147,10 @@ except Exception as e:
     print("'Artist' column not found in the worksheet.", str(e))
     exit()
 
-# Select the "artist" column in Aum
+# Build (or load the cached) IG handle index from the "IG Artist" worksheet in Aum
 aum_worksheet = aum_sheet.worksheet("IG Artist")
-aum_artist_values = aum_worksheet.col_values(1)[1:]  # Exclude header row
-aum_artist_values_lower = [item.lower() for item in aum_artist_values]  # Convert all to lowercase outside the loop
+ig_index = load_ig_index(aum_sheet, aum_worksheet)
+trigram_index = build_trigram_index(ig_index['stripped']) if fuzzy_match else None
 
 written_artists = set()
 artist_counts = defaultdict(int)  # To count the occurrences of each artist
@@ -48,9 +162,10 @@ if cell is not None:
     total_artists = 0
     found_ig_artists = 0
     not_found_artists = 0
+    fuzzy_matches = []
 
     # Write artist values to a text file
-    with open('artists.txt', 'w') as file:
+    with open('artists.txt', 'w', encoding='utf-8') as file:
         for artist in column_values:
             if ',' in artist:
                 artists = artist.split(",")
@@ -61,17 +176,12 @@ if cell is not None:
                 a_lower = a.strip().lower()  # Convert to lowercase and strip whitespaces
                 total_artists += 1
                 if a_lower not in written_artists:
-                    # Remove non-alphabetic characters from the artist name
-                    a_only_alphabets = re.sub('[^a-zA-Z]', '', a_lower)
-
-                    # Perform an exact check first
-                    if a_lower in aum_artist_values_lower:
-                        ig_artist = aum_worksheet.cell(aum_artist_values_lower.index(a_lower) + 2, 4).value
-                        found_ig_artists += 1
-                    # Check again with the modified artist name
-                    elif a_only_alphabets in aum_artist_values_lower:
-                        ig_artist = aum_worksheet.cell(aum_artist_values_lower.index(a_only_alphabets) + 2, 4).value
+                    # Exact, Unicode-folded and punctuation-stripped lookups, then the fuzzy fallback
+                    ig_artist, fuzzy_key = find_ig_artist(a, ig_index, trigram_index)
+                    if ig_artist is not None:
                         found_ig_artists += 1
+                        if fuzzy_key:
+                            fuzzy_matches.append((a.strip(), fuzzy_key))
                     else:
                         ig_artist = ''
                         not_found_artists += 1
@@ -88,6 +198,11 @@ if cell is not None:
         file.write(f"Found IG artists: {found_ig_artists}\n")
         file.write(f"Not found IG artists: {not_found_artists}\n")
 
+        if fuzzy_matches:
+            file.write("\nFuzzy matches (please check):\n")
+            for artist, match in fuzzy_matches:
+                file.write(f"{artist} -> {match}\n")
+
         file.write("\nDuplicate artists:\n")
         for artist, count in artist_counts.items():
             if count > 1:
@@ -96,6 +211,7 @@ if cell is not None:
     print(f"Total artists: {total_artists}")
     print(f"Found IG artists: {found_ig_artists}")
     print(f"Not found IG artists: {not_found_artists}")
+    print(f"Fuzzy matches (please check): {len(fuzzy_matches)}")
     print("Artist values have been written to 'artists.txt' file.")
     os.system('notepad.exe artists.txt')
 else:
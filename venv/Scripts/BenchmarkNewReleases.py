@@ -0,0 +1,170 @@
+"""
+Benchmark for the followed-artist sync and the new releases scan, run against FakeSpotifyApi.py.
+
+For every size it syncs the followed artists and runs save_new_releases_to_playlist in a fresh temporary
+directory (so caches start cold), then reports wall time, API calls, retries, 429s, peak memory and
+tracks/sec. The fake server runs in its own process, so neither the timings nor the memory figures include
+its work. Runs are timed with tracemalloc off; peak memory comes from a second, traced pass over the same
+runs (skip it with --no-memory). Example:
+
+    python BenchmarkNewReleases.py --sizes 100 1000 10000 --latency 0.02 --rate-limit 200
+"""
+import io
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+import requests
+import spotipy
+
+FAKE_SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FakeSpotifyApi.py')
+
+
+def start_fake_server(size, args):
+    """Start FakeSpotifyApi.py in a subprocess on a free port. Returns (process, base url)."""
+    command = [sys.executable, FAKE_SERVER_SCRIPT, '--artists', str(size), '--seed', str(args.seed), '--port', '0',
+               '--latency', str(args.latency), '--latency-jitter', str(args.latency_jitter),
+               '--rate-window', str(args.rate_window), '--retry-after', str(args.retry_after),
+               '--error-rate', str(args.error_rate)]
+    if args.rate_limit is not None:
+        command += ['--rate-limit', str(args.rate_limit)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    match = re.search(r'(http://\S+)/v1/', process.stdout.readline())
+    if not match:
+        process.kill()
+        raise RuntimeError("Fake Spotify API server did not start")
+    return process, match.group(1)
+
+
+def server_stats(url):
+    return requests.get(f"{url}/stats").json()
+
+
+def make_client(nr, url):
+    sp = spotipy.Spotify(auth='fake-token', requests_session=nr.get_requests_session())
+    sp.prefix = url + '/v1/'
+    return sp
+
+
+def reset_script_state(nr, args):
+    # Every run starts cold: empty caches and a fresh scheduler with the benchmark's limits
+    with nr.CACHE_LOCK:
+        nr.ALBUM_CACHE.clear()
+        nr.TRACK_CACHE.clear()
+        nr.PLAYLIST_CACHE.clear()
+        nr.CACHE_STATE.update(loaded=False, last_saved=time.monotonic())
+    nr.SCHEDULER = nr.RequestScheduler(args.max_rps, args.max_workers, start_rate=nr.SPOTIFY_START_RPS)
+
+
+def run_pass(nr, size, args, trace_memory):
+    """Sync and scan `size` artists against a fresh fake server. Returns one row per run."""
+    process, url = start_fake_server(size, args)
+    rows = []
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{size}_")
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        reset_script_state(nr, args)
+        sp = make_client(nr, url)
+        runs = [('sync', lambda: nr.check_for_artist_changes(sp)),
+                ('scan', lambda: nr.save_new_releases_to_playlist(sp))]
+        if args.warm:
+            runs.append(('scan (warm)', lambda: nr.save_new_releases_to_playlist(sp)))
+        for label, run in runs:
+            server_before = server_stats(url)
+            client_before = nr.SCHEDULER.snapshot()
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            if args.verbose:
+                run()
+            else:
+                # Silence the filter summary the script prints to stdout
+                with redirect_stdout(io.StringIO()):
+                    run()
+            elapsed = time.perf_counter() - started
+            peak = float('nan')
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+            server_after = server_stats(url)
+            client_after = nr.SCHEDULER.snapshot()
+            tracks = server_after['tracks_in_playlists'] - server_before['tracks_in_playlists']
+            rows.append({
+                'artists': size,
+                'run': label,
+                'wall_s': elapsed,
+                'api_calls': server_after.get('requests', 0) - server_before.get('requests', 0),
+                'retries': client_after['retries'] - client_before['retries'],
+                '429s': server_after.get('429', 0) - server_before.get('429', 0),
+                'peak_mb': peak,
+                'tracks': tracks,
+                'tracks_per_s': tracks / elapsed if elapsed else 0.0,
+            })
+    finally:
+        os.chdir(previous_dir)
+        process.terminate()
+        process.wait()
+    return rows
+
+
+def run_benchmark(nr, size, args):
+    rows = run_pass(nr, size, args, trace_memory=False)
+    if not args.no_memory:
+        # tracemalloc slows every allocation down several times over, so it gets a pass of its own
+        print(f"Measuring memory for {size} artists...", file=sys.stderr)
+        for row, traced in zip(rows, run_pass(nr, size, args, trace_memory=True)):
+            row['peak_mb'] = traced['peak_mb']
+    return rows
+
+
+def print_table(rows):
+    columns = [('artists', '{:>8}'), ('run', '{:<12}'), ('wall_s', '{:>9.2f}'), ('api_calls', '{:>10}'),
+               ('retries', '{:>8}'), ('429s', '{:>6}'), ('peak_mb', '{:>8.1f}'), ('tracks', '{:>7}'),
+               ('tracks_per_s', '{:>13.1f}')]
+    print(' '.join(f"{name:>{len(fmt.format(rows[0][name]))}}" for name, fmt in columns))
+    for row in rows:
+        print(' '.join(fmt.format(row[name]) for name, fmt in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the new releases scan against a fake Spotify API")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help="Artist counts to run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to every fake API request")
+    parser.add_argument('--latency-jitter', type=float, default=0.01)
+    parser.add_argument('--rate-limit', type=int, default=200, help="Fake API requests allowed per rate window")
+    parser.add_argument('--rate-window', type=float, default=1.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a random 429")
+    parser.add_argument('--max-rps', type=float, default=250, help="Client request rate limit (SPOTIFY_MAX_RPS)")
+    parser.add_argument('--max-workers', type=int, default=16, help="Client concurrency limit (MAX_WORKERS)")
+    parser.add_argument('--warm', action='store_true', help="Also time a second scan of the same range, with warm caches "
+                        "and the existing playlists updated in place")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced pass that measures peak memory")
+    parser.add_argument('--verbose', action='store_true', help="Show the script's log output")
+    args = parser.parse_args()
+
+    # The script configures logging relative to the working directory on import, keep that out of the repo
+    os.chdir(tempfile.mkdtemp(prefix='bench_logs_'))
+    import NewReleasesV4_2025 as nr
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger('spotipy').setLevel(logging.CRITICAL)  # 429s are expected and retried
+
+    rows = []
+    for size in args.sizes:
+        print(f"Running {size} artists...", file=sys.stderr)
+        rows.extend(run_benchmark(nr, size, args))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
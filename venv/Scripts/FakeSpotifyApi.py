@@ -0,0 +1,386 @@
+"""
+Local stand-in for the parts of the Spotify Web API used by NewReleasesV4_2025.py.
+
+Serves a generated catalog of followed artists, albums and tracks, with configurable latency and
+rate limiting (429 + Retry-After), so scans can be run and timed offline. Point spotipy at it with:
+
+    sp = spotipy.Spotify(auth='fake-token')
+    sp.prefix = server.url + '/v1/'
+
+Run on its own with: python FakeSpotifyApi.py --artists 1000 --port 8899
+GET /stats returns the request counters; it isn't delayed, rate limited or counted.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+from collections import Counter, deque
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+USER_ID = 'bench_user'
+PLAYLIST_MAX_TRACKS = 10000  # Spotify rejects adds past this many items
+TRACK_NAME_SUFFIXES = [" (Live)", " - Extended Mix", " (Sped Up)", " - Acoustic Session", " (Instrumental)"]
+
+
+# --- Generated Catalog ---
+class FakeCatalog:
+    """
+    Deterministic catalog, generated on demand from the seed so that even large catalogs take no memory.
+    - Artist i follows the pattern: a newest release that is new (within the last week) with
+      probability new_release_ratio, followed by older albums.
+    - A new single is sometimes followed by a new album containing the same songs, and every
+      collab_every-th artist shares its newest release with the next artist.
+    """
+
+    def __init__(self, artist_count, seed=0, albums_per_artist=5, new_release_ratio=0.3, collab_every=10):
+        self.artist_count = artist_count
+        self.seed = seed
+        self.albums_per_artist = albums_per_artist
+        self.new_release_ratio = new_release_ratio
+        self.collab_every = collab_every
+        self.today = datetime.date.today()
+
+    def artist_id(self, index):
+        return f"ar{index:07d}"
+
+    def artist(self, index):
+        return {'id': self.artist_id(index), 'name': f"Artist {index}", 'type': 'artist',
+                'uri': f"spotify:artist:{self.artist_id(index)}"}
+
+    def artist_index(self, artist_id):
+        index = int(artist_id[2:])
+        if not 0 <= index < self.artist_count:
+            raise KeyError(artist_id)
+        return index
+
+    def album_plan(self, artist_index):
+        # (days ago, track count) for each of the artist's own albums, newest first
+        rnd = random.Random(f"{self.seed}:artist:{artist_index}")
+        plan = []
+        is_new = rnd.random() < self.new_release_ratio
+        plan.append((rnd.randint(0, 6) if is_new else rnd.randint(7, 30), rnd.randint(1, 2)))
+        if is_new and rnd.random() < 0.3:
+            # The single's songs come out again on an album the same week
+            plan.append((max(0, plan[0][0] - 1), rnd.randint(6, 12)))
+        while len(plan) < self.albums_per_artist:
+            plan.append((plan[-1][0] + rnd.randint(20, 120), rnd.randint(4, 12)))
+        return plan
+
+    def album_id(self, artist_index, album_index):
+        return f"al{artist_index:07d}{album_index:02d}"
+
+    def artist_albums(self, artist_id):
+        artist_index = self.artist_index(artist_id)
+        albums = [self.album(self.album_id(artist_index, j)) for j in range(self.albums_per_artist)]
+        if artist_index % self.collab_every == 1:
+            albums.append(self.album(self.album_id(artist_index - 1, 0)))
+        albums.sort(key=lambda album: album['release_date'], reverse=True)
+        return albums
+
+    def album(self, album_id, with_tracks=False):
+        artist_index, album_index = int(album_id[2:9]), int(album_id[9:])
+        if not 0 <= artist_index < self.artist_count or album_index >= self.albums_per_artist:
+            return None
+        days_ago, track_count = self.album_plan(artist_index)[album_index]
+        artists = [self.artist(artist_index)]
+        if artist_index % self.collab_every == 0 and album_index == 0 and artist_index + 1 < self.artist_count:
+            artists.append(self.artist(artist_index + 1))
+        album = {
+            'id': album_id,
+            'name': f"Release {artist_index}-{album_index}",
+            'album_type': 'single' if track_count <= 2 else 'album',
+            'release_date': str(self.today - datetime.timedelta(days=days_ago)),
+            'release_date_precision': 'day',
+            'artists': artists,
+            'uri': f"spotify:album:{album_id}",
+        }
+        if with_tracks:
+            tracks = self.album_tracks(album_id, artists, track_count, album_index)
+            album['tracks'] = {'items': tracks, 'total': len(tracks), 'next': None}
+        return album
+
+    def album_tracks(self, album_id, artists, track_count, album_index):
+        rnd = random.Random(f"{self.seed}:album:{album_id}")
+        # Song numbering restarts on the album that follows a new single, so its first songs repeat the single
+        first_song = 0 if album_index <= 1 else album_index * 20
+        tracks = []
+        for k in range(track_count):
+            name = f"Song {album_id[2:9]}-{first_song + k}"
+            if rnd.random() < 0.1:
+                name += rnd.choice(TRACK_NAME_SUFFIXES)
+            track_id = f"tr{album_id[2:]}{k:02d}"
+            tracks.append({
+                'id': track_id,
+                'name': name,
+                'uri': f"spotify:track:{track_id}",
+                'duration_ms': rnd.randint(60, 330) * 1000,
+                'explicit': rnd.random() < 0.2,
+                'artists': artists,
+                'track_number': k + 1,
+            })
+        return tracks
+
+
+# --- HTTP Server ---
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """
+    Serves a FakeCatalog and keeps playlists in memory.
+    - latency (+ up to latency_jitter) seconds are added to every request.
+    - More than rate_limit requests within rate_window seconds get a 429 with Retry-After: retry_after,
+      and error_rate is the probability of a 429 on any other request.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, catalog, latency=0.0, latency_jitter=0.0, rate_limit=None, rate_window=1.0,
+                 retry_after=1, error_rate=0.0):
+        super().__init__(address, FakeSpotifyHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.recent_requests = deque()
+        self.stats = Counter()
+        self.playlists = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self):
+        # True if the request may be served, False if it gets a 429
+        with self.lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            while self.recent_requests and now - self.recent_requests[0] > self.rate_window:
+                self.recent_requests.popleft()
+            limited = self.rate_limit is not None and len(self.recent_requests) >= self.rate_limit
+            if limited or random.random() < self.error_rate:
+                self.stats['429'] += 1
+                return False
+            self.recent_requests.append(now)
+            return True
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['tracks_in_playlists'] = sum(len(playlist['tracks']) for playlist in self.playlists.values())
+        return stats
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Older spotipy versions use playlists/{id}/tracks, newer ones playlists/{id}/items
+    routes = [
+        ('GET', r'/v1/me', 'get_me'),
+        ('GET', r'/v1/me/following', 'get_following'),
+        ('GET', r'/v1/artists/(?P<artist_id>[^/]+)/albums', 'get_artist_albums'),
+        ('GET', r'/v1/albums', 'get_albums'),
+        ('GET', r'/v1/me/playlists', 'get_my_playlists'),
+        ('GET', r'/v1/playlists/(?P<playlist_id>[^/]+)', 'get_playlist'),
+        ('GET', r'/v1/playlists/(?P<playlist_id>[^/]+)/(?:tracks|items)', 'get_playlist_items'),
+        ('POST', r'/v1/users/(?P<user_id>[^/]+)/playlists', 'create_playlist'),
+        ('POST', r'/v1/me/playlists', 'create_playlist'),
+        ('POST', r'/v1/playlists/(?P<playlist_id>[^/]+)/(?:tracks|items)', 'add_tracks'),
+        ('DELETE', r'/v1/playlists/(?P<playlist_id>[^/]+)/(?:tracks|items)', 'remove_tracks'),
+        ('DELETE', r'/v1/playlists/(?P<playlist_id>[^/]+)/followers', 'unfollow_playlist'),
+    ]
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    def dispatch(self, method):
+        server = self.server
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+        self.query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self.body = json.loads(body) if body else None
+
+        if method == 'GET' and path == '/stats':
+            self.send_json(200, server.snapshot())
+            return
+        if server.latency or server.latency_jitter:
+            time.sleep(server.latency + random.uniform(0, server.latency_jitter))
+        for route_method, pattern, handler_name in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                with server.lock:
+                    server.stats[handler_name] += 1
+                if not server.admit():
+                    self.send_json(429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+                                   headers={'Retry-After': str(server.retry_after)})
+                    return
+                try:
+                    status, payload = getattr(self, handler_name)(**match.groupdict())
+                except (KeyError, ValueError) as e:
+                    status, payload = 404, {'error': {'status': 404, 'message': f"Not found: {e}"}}
+                self.send_json(status, payload)
+                return
+        self.send_json(404, {'error': {'status': 404, 'message': f"No fake endpoint for {method} {path}"}})
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    # --- Endpoints ---
+    def get_me(self):
+        return 200, {'id': USER_ID, 'display_name': 'Benchmark User', 'type': 'user'}
+
+    def get_following(self):
+        catalog = self.server.catalog
+        limit = min(int(self.query.get('limit', 20)), 50)
+        after = self.query.get('after')
+        start = catalog.artist_index(after) + 1 if after else 0
+        items = [catalog.artist(i) for i in range(start, min(start + limit, catalog.artist_count))]
+        has_more = start + limit < catalog.artist_count
+        return 200, {'artists': {
+            'items': items,
+            'cursors': {'after': items[-1]['id'] if items and has_more else None},
+            'limit': limit,
+            'total': catalog.artist_count,
+            'next': f"/v1/me/following?type=artist&after={items[-1]['id']}" if items and has_more else None,
+        }}
+
+    def get_artist_albums(self, artist_id):
+        limit = min(int(self.query.get('limit', 20)), 50)
+        offset = int(self.query.get('offset', 0))
+        albums = self.server.catalog.artist_albums(artist_id)
+        return 200, {'items': albums[offset:offset + limit], 'limit': limit, 'offset': offset,
+                     'total': len(albums), 'next': None}
+
+    def get_albums(self):
+        album_ids = [album_id for album_id in self.query.get('ids', '').split(',') if album_id]
+        if len(album_ids) > 20:
+            return 400, {'error': {'status': 400, 'message': 'Too many ids requested'}}
+        return 200, {'albums': [self.server.catalog.album(album_id, with_tracks=True) for album_id in album_ids]}
+
+    def playlist_summary(self, playlist):
+        return {'id': playlist['id'], 'name': playlist['name'], 'snapshot_id': playlist['snapshot_id'],
+                'owner': playlist['owner'], 'tracks': {'total': len(playlist['tracks'])}}
+
+    def get_my_playlists(self):
+        limit = min(int(self.query.get('limit', 20)), 50)
+        offset = int(self.query.get('offset', 0))
+        with self.server.lock:
+            # Like Spotify, a deleted (unfollowed) playlist is no longer listed but can still be fetched by ID
+            playlists = [self.playlist_summary(playlist) for playlist in self.server.playlists.values()
+                         if playlist['followed']]
+        has_more = offset + limit < len(playlists)
+        return 200, {'items': playlists[offset:offset + limit], 'limit': limit, 'offset': offset,
+                     'total': len(playlists),
+                     'next': f"/v1/me/playlists?offset={offset + limit}&limit={limit}" if has_more else None}
+
+    def get_playlist(self, playlist_id):
+        # The fields filter is ignored, the summary already holds everything the script asks for
+        with self.server.lock:
+            return 200, self.playlist_summary(self.server.playlists[playlist_id])
+
+    def get_playlist_items(self, playlist_id):
+        limit = min(int(self.query.get('limit', 100)), 100)
+        offset = int(self.query.get('offset', 0))
+        with self.server.lock:
+            tracks = list(self.server.playlists[playlist_id]['tracks'])
+        has_more = offset + limit < len(tracks)
+        return 200, {'items': [{'track': {'uri': uri}} for uri in tracks[offset:offset + limit]],
+                     'limit': limit, 'offset': offset, 'total': len(tracks),
+                     'next': f"/v1/playlists/{playlist_id}/items?offset={offset + limit}" if has_more else None}
+
+    def create_playlist(self, user_id=USER_ID):
+        server = self.server
+        with server.lock:
+            playlist_id = f"pl{len(server.playlists):06d}"
+            server.playlists[playlist_id] = {'id': playlist_id, 'name': self.body['name'], 'tracks': [],
+                                             'snapshot_id': f"{playlist_id}-0", 'owner': {'id': user_id},
+                                             'followed': True}
+        return 201, {'id': playlist_id, 'name': self.body['name'], 'snapshot_id': f"{playlist_id}-0"}
+
+    def add_tracks(self, playlist_id):
+        uris = self.body['uris'] if isinstance(self.body, dict) else self.body
+        if len(uris) > 100:
+            return 400, {'error': {'status': 400, 'message': 'Too many tracks requested'}}
+        with self.server.lock:
+            if len(self.server.playlists[playlist_id]['tracks']) + len(uris) > PLAYLIST_MAX_TRACKS:
+                return 400, {'error': {'status': 400, 'message': 'Playlist size limit reached'}}
+        return 201, {'snapshot_id': self.update_playlist(playlist_id, lambda tracks: tracks + uris)}
+
+    def remove_tracks(self, playlist_id):
+        uris = {track['uri'] for track in self.body.get('items', self.body.get('tracks', []))}
+        return 200, {'snapshot_id': self.update_playlist(
+            playlist_id, lambda tracks: [uri for uri in tracks if uri not in uris])}
+
+    def unfollow_playlist(self, playlist_id):
+        with self.server.lock:
+            self.server.playlists[playlist_id]['followed'] = False
+        return 200, {}
+
+    def update_playlist(self, playlist_id, change):
+        with self.server.lock:
+            playlist = self.server.playlists[playlist_id]
+            playlist['tracks'] = change(playlist['tracks'])
+            version = int(playlist['snapshot_id'].rsplit('-', 1)[1]) + 1
+            playlist['snapshot_id'] = f"{playlist_id}-{version}"
+            return playlist['snapshot_id']
+
+
+def start_server(catalog, host='127.0.0.1', port=0, **options):
+    """
+    Start a FakeSpotifyServer in a background thread. port=0 picks a free port; see server.url.
+    """
+    server = FakeSpotifyServer((host, port), catalog, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Spotify Web API")
+    parser.add_argument('--artists', type=int, default=1000, help="Number of followed artists")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8899, help="0 picks a free port")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help="Extra random seconds per request")
+    parser.add_argument('--rate-limit', type=int, default=None, help="Requests allowed per rate window")
+    parser.add_argument('--rate-window', type=float, default=1.0, help="Rate window in seconds")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After sent with a 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a random 429")
+    args = parser.parse_args()
+
+    server = FakeSpotifyServer(('127.0.0.1', args.port), FakeCatalog(args.artists, seed=args.seed),
+                               latency=args.latency, latency_jitter=args.latency_jitter,
+                               rate_limit=args.rate_limit, rate_window=args.rate_window,
+                               retry_after=args.retry_after, error_rate=args.error_rate)
+    # BenchmarkNewReleases.py reads the URL from this line
+    print(f"Fake Spotify API with {args.artists} artists at {server.url}/v1/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Stats: {server.snapshot()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1514 @@
+import os
+import re
+import sys
+import json
+import time
+import datetime
+from datetime import date
+import uuid
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import random
+import threading
+import queue
+import requests
+import spotipy
+from spotipy.oauth2 import SpotifyOAuth
+from spotipy.exceptions import SpotifyException
+from dotenv import load_dotenv
+from flask import Flask, request, jsonify, redirect, Response, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Load environment variables from .env file
+load_dotenv(r"C:\Aum.MusicRepo\.env")
+
+# Constants and configuration
+CLIENT_ID = os.getenv("CLIENT_ID")
+CLIENT_SECRET = os.getenv("CLIENT_SECRET")
+REDIRECT_URI = 'http://localhost:8888/callback'
+SCOPE = ('playlist-modify-public playlist-modify-private user-follow-read '
+         'user-follow-modify user-library-read user-library-modify user-read-email user-read-private')
+ARTISTS_FILE = 'followed_artists.json'
+ARTISTS_META_FILE = 'followed_artists.meta.json'
+EXCLUSION_FILE = 'ExclusionArtists.txt'
+NO_FILTER_FILE = 'ArtistNoFilter.txt'
+FILTER_RULES_FILE = 'FilterRules.json'
+CACHE_FILE = 'script_cache.json'
+SYNC_CHECKPOINT_FILE = 'followed_artists_sync.json'
+LOG_FILENAME = 'NewReleasesLogs.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Log file size before it is rotated
+LOG_BACKUP_COUNT = 3
+LOG_TAIL_BYTES = 64 * 1024  # Most log bytes the web UI fetches per request
+MAX_KEPT_JOBS = 20  # Finished scan jobs kept for the web UI
+CACHE_VERSION = 1
+CACHE_TTL_HOURS = float(os.getenv("CACHE_TTL_HOURS", "24"))  # How long an artist's release list stays fresh
+CACHE_SAVE_INTERVAL = 60  # Seconds between cache checkpoints during a scan
+SYNC_CHECKPOINT_INTERVAL = 5  # Seconds between checkpoints of the followed artists sync
+SYNC_CHECKPOINT_MAX_AGE_HOURS = 24  # Older sync checkpoints are ignored and the sync starts over
+SPOTIFY_MAX_RPS = float(os.getenv("SPOTIFY_MAX_RPS", "100"))  # Upper bound for the shared request rate
+SPOTIFY_START_RPS = float(os.getenv("SPOTIFY_START_RPS", "10"))  # Rate the scheduler starts probing upward from
+MAX_WORKERS = int(os.getenv("SPOTIFY_MAX_WORKERS", "16"))  # Upper bound for concurrent requests
+MAX_RETRIES = 6
+RETRY_BACKOFF_CAP = 60  # Longest backoff (seconds) between retries of a failed request
+ALBUM_BATCH_SIZE = 20  # Most albums sp.albums accepts per call
+PLAYLIST_CHUNK_SIZE = 100  # Most tracks a playlist accepts per call
+PLAYLIST_MAX_TRACKS = 10000  # Spotify's item limit per playlist, a full playlist continues in "<name> (2)"
+PLAYLIST_CACHE_KEEP = 10  # Most recently used playlists whose contents stay in the cache
+PIPELINE_QUEUE_SIZE = 500  # Items buffered between the stages of the scan pipeline
+
+# Used when FILTER_RULES_FILE is missing, or for any rule it leaves out
+DEFAULT_FILTER_RULES = {
+    'forbidden_words': ["live", "session", "לייב", "קאבר", "a capella", "acapella", "techno", "extended",
+                        "sped up", "speed up", "intro", "slow", "remaster", "instrumental"],
+    'min_duration_sec': 90,
+    'max_duration_sec': 270,
+}
+
+# Configure logging to file and stdout.
+# Records go through a queue and are written by a listener thread, so scan workers never wait on file I/O.
+# The file is only opened on the first record (delay=True), and the app runs without the reloader: on
+# Windows a second process holding the log open makes every rollover fail.
+LOG_QUEUE = queue.Queue()
+LOG_LISTENER = QueueListener(LOG_QUEUE,
+                             RotatingFileHandler(LOG_FILENAME, maxBytes=LOG_MAX_BYTES,
+                                                 backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True),
+                             logging.StreamHandler(sys.stdout))
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(LOG_QUEUE)])
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop)
+
+
+def log_message(message):
+    logging.info(message)
+
+
+# --- Utility Functions ---
+def load_ids_from_file(file_name):
+    try:
+        if os.path.exists(file_name):
+            with open(file_name, 'r', encoding='utf-8') as f:
+                return [line.strip() for line in f if line.strip()]
+        else:
+            log_message(f"File {file_name} not found. Proceeding without it.")
+            return []
+    except Exception as e:
+        log_message(f"Error loading file {file_name}: {e}")
+        return []
+
+
+def load_artists_from_file(file_name):
+    try:
+        if os.path.exists(file_name):
+            with open(file_name, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        else:
+            log_message(f"File {file_name} not found. Proceeding without it.")
+            return {}
+    except Exception as e:
+        log_message(f"Error loading file {file_name}: {e}")
+        return {}
+
+
+def save_json_to_file(file_name, data, indent=4):
+    # Write to a temp file and swap it in, so a crash never leaves a half-written file behind
+    tmp_file_name = f"{file_name}.tmp"
+    try:
+        with open(tmp_file_name, 'w', encoding='utf-8') as f:
+            # Without indentation, also drop the spaces after separators for the most compact output
+            separators = (',', ':') if indent is None else None
+            json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file_name, file_name)
+    except Exception as e:
+        log_message(f"Error saving to file {file_name}: {e}")
+
+
+def save_artists_file(artists):
+    save_json_to_file(ARTISTS_FILE, artists, indent=None)
+    save_artists_meta(len(artists))
+
+
+def save_artists_meta(count, synced_at=None):
+    # synced_at is when the list was last checked against Spotify, which a sync that finds no changes
+    # doesn't show in ARTISTS_FILE's mtime since the file isn't rewritten
+    save_json_to_file(ARTISTS_META_FILE, {'mtime': os.path.getmtime(ARTISTS_FILE), 'count': count,
+                                          'synced_at': synced_at or time.time()})
+
+
+def get_artists_file_info():
+    """
+    Returns (time of the last completed sync, number of artists) for ARTISTS_FILE, or None if it doesn't
+    exist yet. Both come from ARTISTS_META_FILE; ARTISTS_FILE is only parsed when the metadata is missing or
+    stale, and its mtime then stands in for the sync time.
+    """
+    if not os.path.exists(ARTISTS_FILE):
+        return None
+    mtime = os.path.getmtime(ARTISTS_FILE)
+    meta = load_artists_from_file(ARTISTS_META_FILE) if os.path.exists(ARTISTS_META_FILE) else {}
+    if meta.get('mtime') != mtime or 'synced_at' not in meta:
+        meta = {'count': len(load_artists_from_file(ARTISTS_FILE)), 'synced_at': mtime}
+        save_artists_meta(meta['count'], mtime)
+    return meta['synced_at'], meta['count']
+
+
+# --- Cache Functions ---
+# Persistent cache kept in CACHE_FILE:
+#   ALBUM_CACHE: artist_id -> {'checked_at': <unix time>, 'albums': [...]}, refreshed after CACHE_TTL_HOURS
+#   TRACK_CACHE: album_id -> [tracks], never refetched since a released album's track list doesn't change
+#   PLAYLIST_CACHE: playlist name -> {'id', 'part', 'snapshot_id', 'uris', 'previous_uris', 'used_at'} for the
+#                   latest part of the playlist (previous_uris: the part before it, which is full and no longer
+#                   written to), trusted while the snapshot_id matches; only PLAYLIST_CACHE_KEEP are kept
+ALBUM_CACHE = {}
+TRACK_CACHE = {}
+PLAYLIST_CACHE = {}
+CACHE_LOCK = threading.Lock()
+CACHE_SAVE_LOCK = threading.Lock()
+CACHE_STATE = {'loaded': False, 'last_saved': time.monotonic()}
+
+
+def slim_album(album):
+    return {'id': album['id'], 'name': album['name'], 'release_date': album['release_date']}
+
+
+def slim_track(track):
+    return {
+        'uri': track['uri'],
+        'name': track['name'],
+        'duration_ms': track['duration_ms'],
+        'explicit': track.get('explicit', False),
+        'artists': [{'id': artist['id'], 'name': artist['name']} for artist in track.get('artists', [])]
+    }
+
+
+def load_cache():
+    with CACHE_LOCK:
+        if CACHE_STATE['loaded']:
+            return
+        CACHE_STATE['loaded'] = True
+        data = load_artists_from_file(CACHE_FILE)
+        if data.get('version') != CACHE_VERSION:
+            if data:
+                log_message(f"Ignoring cache file {CACHE_FILE} with unknown version {data.get('version')}")
+            return
+        ALBUM_CACHE.update(data.get('artists', {}))
+        TRACK_CACHE.update(data.get('album_tracks', {}))
+        PLAYLIST_CACHE.update(data.get('playlists', {}))
+    log_message(f"Loaded cache: {len(ALBUM_CACHE)} artists, {len(TRACK_CACHE)} albums")
+
+
+def save_cache():
+    with CACHE_LOCK:
+        artists = dict(ALBUM_CACHE)
+        CACHE_STATE['last_saved'] = time.monotonic()
+        # Only keep track lists for albums that can still come up in an artist's latest releases
+        referenced = {album['id'] for entry in artists.values() for album in entry['albums']}
+        album_tracks = {aid: tracks for aid, tracks in TRACK_CACHE.items() if aid in referenced}
+        playlists = dict(PLAYLIST_CACHE)
+    with CACHE_SAVE_LOCK:
+        save_json_to_file(CACHE_FILE, {'version': CACHE_VERSION, 'artists': artists, 'album_tracks': album_tracks,
+                                       'playlists': playlists}, indent=None)
+
+
+def mark_cache_updated():
+    # Checkpoint by time rather than by entry count: each save rewrites the whole file, which
+    # would make a large scan spend most of its time serializing the cache
+    with CACHE_LOCK:
+        checkpoint = time.monotonic() - CACHE_STATE['last_saved'] >= CACHE_SAVE_INTERVAL
+        if checkpoint:
+            CACHE_STATE['last_saved'] = time.monotonic()
+    if checkpoint:
+        save_cache()
+
+
+def get_cached_artist_albums(artist_id):
+    with CACHE_LOCK:
+        entry = ALBUM_CACHE.get(artist_id)
+    if entry and time.time() - entry['checked_at'] < CACHE_TTL_HOURS * 3600:
+        return entry['albums']
+    return None
+
+
+def get_cached_album_tracks(album_id):
+    with CACHE_LOCK:
+        return TRACK_CACHE.get(album_id)
+
+
+def cache_artist_albums(artist_id, albums):
+    with CACHE_LOCK:
+        ALBUM_CACHE[artist_id] = {'checked_at': time.time(), 'albums': albums}
+    mark_cache_updated()
+
+
+def cache_playlist(name, playlist_id, snapshot_id, uris, part=1, previous_uris=()):
+    with CACHE_LOCK:
+        if snapshot_id:
+            PLAYLIST_CACHE[name] = {'id': playlist_id, 'part': part, 'snapshot_id': snapshot_id, 'uris': list(uris),
+                                    'previous_uris': list(previous_uris), 'used_at': time.time()}
+        else:
+            PLAYLIST_CACHE.pop(name, None)
+        # A new dated playlist comes every week, drop the ones that haven't been used for the longest
+        by_age = sorted(PLAYLIST_CACHE, key=lambda cached_name: PLAYLIST_CACHE[cached_name].get('used_at', 0))
+        for cached_name in by_age[:-PLAYLIST_CACHE_KEEP]:
+            del PLAYLIST_CACHE[cached_name]
+
+
+# --- Request Scheduling ---
+class RequestScheduler:
+    """
+    Paces every Spotify call made by the script, from any thread.
+    - Token bucket: calls are spaced to the current rate, starting at start_rate (default max_rate).
+    - Adaptive concurrency: at most `concurrency` calls are in flight at once.
+    - Until the first 429 every successful call raises the rate by 1 request/s, so it doubles quickly
+      towards max_rate and finds the real API limit instead of staying at a guessed one.
+    - A 429 on any thread pauses all threads until its Retry-After has passed and halves the rate
+      and concurrency; from then on successful calls grow both back slowly towards their maximum.
+    - 429s, 5xx and network errors are retried with jittered backoff, up to max_retries times.
+      Calls made with idempotent=False (adding tracks, creating a playlist) are only retried when the
+      request surely wasn't applied: on a 429 or a failed connection, not on a 5xx or a read timeout.
+    """
+
+    def __init__(self, max_rate, max_concurrency, max_retries=MAX_RETRIES, min_rate=1.0, start_rate=None):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = min(start_rate or max_rate, max_rate)
+        self.probing = True
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.max_retries = max_retries
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.stats = {'api_calls': 0, 'retries': 0, 'throttled': 0, 'throttle_wait': 0.0}
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self.last_refill = now
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.last_refill) * self.rate)
+                    self.last_refill = now
+                    if self.in_flight >= int(self.concurrency):
+                        wait = None  # Woken up by release()
+                    elif self.tokens < 1:
+                        wait = (1 - self.tokens) / self.rate
+                    else:
+                        self.tokens -= 1
+                        self.in_flight += 1
+                        self.stats['api_calls'] += 1
+                        return
+                self.condition.wait(wait)
+
+    def release(self, success=True):
+        with self.condition:
+            self.in_flight -= 1
+            if success:
+                # Additive increase: about +1 request/s and +1 concurrent call per `rate` successful calls,
+                # or +1 request/s per call while still probing for the limit
+                self.rate = min(self.max_rate, self.rate + (1 if self.probing else 1 / self.rate))
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+    def backoff(self, delay):
+        with self.condition:
+            now = time.monotonic()
+            if now >= self.paused_until:
+                # Only the first 429 of a burst shrinks the limits, the rest just extend the pause
+                self.probing = False
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+            resume_at = max(self.paused_until, now + delay)
+            self.stats['throttled'] += 1
+            self.stats['throttle_wait'] += resume_at - max(self.paused_until, now)
+            self.paused_until = resume_at
+            self.tokens = 0.0
+            self.condition.notify_all()
+
+    def call(self, func, *args, idempotent=True, **kwargs):
+        name = getattr(func, '__name__', 'request')
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except SpotifyException as e:
+                self.release(success=False)
+                retryable = e.http_status == 429 or (e.http_status >= 500 and idempotent)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = retry_delay(attempt)
+                if e.http_status == 429:
+                    retry_after = (e.headers or {}).get('Retry-After')
+                    if retry_after and str(retry_after).isdigit():
+                        delay = int(retry_after) + random.uniform(0, 1)
+                    log_message(f"Error 429: Too Many Requests in {name}. Pausing all requests for {delay:.1f} seconds.")
+                    self.backoff(delay)
+                else:
+                    log_message(f"SpotifyException {e.http_status} in {name}. Retrying in {delay:.1f} seconds.")
+                    time.sleep(delay)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.release(success=False)
+                # ConnectTimeout is a ConnectionError too, only a read timeout may follow an applied request
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectionError)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = retry_delay(attempt)
+                log_message(f"Network error in {name}: {e}. Retrying in {delay:.1f} seconds.")
+                time.sleep(delay)
+            except Exception:
+                self.release(success=False)
+                raise
+            else:
+                self.release()
+                return result
+            with self.condition:
+                self.stats['retries'] += 1
+
+    def snapshot(self):
+        with self.condition:
+            return dict(self.stats, rate=round(self.rate, 2), concurrency=int(self.concurrency))
+
+
+def retry_delay(attempt):
+    # Exponential backoff with jitter so retrying threads don't hit the API in lockstep
+    return min(RETRY_BACKOFF_CAP, 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+SCHEDULER = RequestScheduler(SPOTIFY_MAX_RPS, MAX_WORKERS, start_rate=SPOTIFY_START_RPS)
+
+
+def spotify_call(func, *args, **kwargs):
+    return SCHEDULER.call(func, *args, **kwargs)
+
+
+class ScanProgress:
+    """
+    Thread-safe counters for a running scan, read by the web UI while the scan is in progress.
+    Spotify request counts are reported relative to SCHEDULER's stats when start() was called, and are 0
+    before that, so a queued job doesn't count the calls of the job running ahead of it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {'artists_total': 0, 'artists_done': 0, 'releases_found': 0,
+                         'tracks_filtered': 0, 'tracks_excluded': 0}
+        self.scheduler_start = None
+
+    def start(self):
+        with self.lock:
+            self.scheduler_start = SCHEDULER.snapshot()
+
+    def increment(self, key, count=1):
+        with self.lock:
+            self.counters[key] += count
+
+    def set(self, key, value):
+        with self.lock:
+            self.counters[key] = value
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            scheduler_start = self.scheduler_start
+        scheduler = SCHEDULER.snapshot()
+        for key in ('api_calls', 'retries', 'throttled', 'throttle_wait'):
+            counters[key] = round(scheduler[key] - scheduler_start[key], 1) if scheduler_start else 0
+        return counters
+
+
+# --- Spotify Functions ---
+def get_requests_session():
+    # One pooled connection per worker. Retries are left to SCHEDULER, which needs to see every 429
+    # with its Retry-After header to slow down all threads instead of each one sleeping on its own.
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=MAX_WORKERS, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_spotify_client():
+    sp_oauth = SpotifyOAuth(
+        client_id=CLIENT_ID,
+        client_secret=CLIENT_SECRET,
+        redirect_uri=REDIRECT_URI,
+        scope=SCOPE
+    )
+    return spotipy.Spotify(auth_manager=sp_oauth, requests_session=get_requests_session())
+
+
+def slim_artist(artist):
+    return {'id': artist['id'], 'name': artist['name']}
+
+
+def get_followed_artists(sp):
+    """
+    Download the followed artists list, 50 per page, keeping only the fields the scan uses.
+    The `after` cursor and the artists fetched so far are checkpointed to SYNC_CHECKPOINT_FILE every
+    SYNC_CHECKPOINT_INTERVAL seconds, so an interrupted sync resumes close to where it stopped instead
+    of starting over. Checkpoints older than SYNC_CHECKPOINT_MAX_AGE_HOURS, or whose cursor Spotify
+    rejects, are dropped and the sync starts from the first page.
+    Errors spotify_call couldn't retry away are raised; the checkpoint is kept for the next attempt.
+    """
+    artists = {}
+    next_page = None
+    last_checkpoint = time.monotonic()
+    if os.path.exists(SYNC_CHECKPOINT_FILE):
+        if time.time() - os.path.getmtime(SYNC_CHECKPOINT_FILE) > SYNC_CHECKPOINT_MAX_AGE_HOURS * 3600:
+            log_message(f"Ignoring followed artists sync checkpoint older than {SYNC_CHECKPOINT_MAX_AGE_HOURS} hours")
+            os.remove(SYNC_CHECKPOINT_FILE)
+        else:
+            checkpoint = load_artists_from_file(SYNC_CHECKPOINT_FILE)
+            artists = checkpoint.get('artists', {})
+            next_page = checkpoint.get('after')
+            log_message(f"Resuming followed artists sync after {len(artists)} artists")
+    resumed = next_page is not None
+    while True:
+        try:
+            results = spotify_call(sp.current_user_followed_artists, limit=50, after=next_page)
+        except SpotifyException as e:
+            if not (resumed and e.http_status in (400, 404)):
+                raise
+            log_message(f"Spotify rejected the saved sync cursor ({e}), starting the sync over")
+            os.remove(SYNC_CHECKPOINT_FILE)
+            artists = {}
+            next_page = None
+            resumed = False
+            continue
+        resumed = False
+        page = results['artists']['items']
+        for artist in page:
+            artists[artist['id']] = slim_artist(artist)
+        if page:
+            log_message(f"Fetched {len(artists)} artists. First artist in this batch: {page[0]['name']}")
+        next_page = results['artists']['cursors']['after']
+        if not next_page:
+            break
+        if time.monotonic() - last_checkpoint >= SYNC_CHECKPOINT_INTERVAL:
+            save_json_to_file(SYNC_CHECKPOINT_FILE, {'after': next_page, 'artists': artists}, indent=None)
+            last_checkpoint = time.monotonic()
+    return artists
+
+
+def log_artist_changes(label, artist_ids, artists):
+    if not artist_ids:
+        return
+    names = sorted(artists[aid]['name'] for aid in artist_ids)
+    shown = ', '.join(names[:20])
+    more = f" and {len(names) - 20} more" if len(names) > 20 else ""
+    log_message(f"{label} artists ({len(names)}): {shown}{more}")
+
+
+def check_for_artist_changes(sp):
+    old_artists = load_artists_from_file(ARTISTS_FILE)
+    new_artists = get_followed_artists(sp)
+    total_artists = len(new_artists)
+    log_message(f"Found {total_artists} artists.")
+    removed_artists = set(old_artists) - set(new_artists)
+    added_artists = set(new_artists) - set(old_artists)
+    if removed_artists or added_artists:
+        log_message(f"Found changes in followed artists. Removed: {len(removed_artists)}, Added: {len(added_artists)}")
+        log_artist_changes("Removed", removed_artists, old_artists)
+        log_artist_changes("Added", added_artists, new_artists)
+    # Only rewrite the file when something changed (this also converts files holding full artist objects)
+    if new_artists != old_artists or not os.path.exists(ARTISTS_FILE):
+        save_artists_file(new_artists)
+    else:
+        log_message(f"No changes in followed artists, {ARTISTS_FILE} left as is.")
+        save_artists_meta(len(new_artists))
+    if os.path.exists(SYNC_CHECKPOINT_FILE):
+        os.remove(SYNC_CHECKPOINT_FILE)
+    return list(new_artists.values())
+
+
+def get_artist_albums(sp, artist_id):
+    albums = get_cached_artist_albums(artist_id)
+    if albums is not None:
+        return albums
+    try:
+        albums = spotify_call(sp.artist_albums, artist_id, include_groups='single,album', limit=5)['items']
+        albums = [slim_album(album) for album in albums]
+        cache_artist_albums(artist_id, albums)
+        return albums
+    except SpotifyException as e:
+        log_message(f"SpotifyException occurred: {e}")
+        return []
+    except Exception as e:
+        log_message(f"Error fetching albums for artist {artist_id}: {e}")
+        return []
+
+
+def get_normalized_key(track):
+    """
+    Create a normalized key based on track name and the first two artist names.
+    """
+    normalized_name = track['name'].lower().strip()
+    artists = [artist['name'].lower().strip() for artist in track.get('artists', [])][:2]
+    return (normalized_name, tuple(artists))
+
+
+def load_filter_rules(file_name):
+    rules = dict(DEFAULT_FILTER_RULES)
+    if os.path.exists(file_name):
+        rules.update(load_artists_from_file(file_name))
+    return rules
+
+
+class TrackFilter:
+    """
+    Filtering rules compiled once per scan and applied to every release with shared state, so grouping
+    and de-duplication cover the whole scan instead of a single album. Not thread-safe: the scan feeds it
+    from filter_stage only.
+    Filtering logic:
+    1. Tracks whose first artist is in no_filter_artists are always kept.
+    2. Otherwise exclude tracks whose name contains a forbidden word, or whose duration is outside
+       the min/max window.
+    3. Group remaining tracks by normalized key (track name + first two artist names) and keep one
+       track per group, chosen by, in order:
+       a. an explicit version (per Spotify metadata) over a clean one,
+       b. the earliest release date, so the single is kept rather than the album track that follows it,
+       c. the lowest URI, only to settle versions released on the same day.
+       The choice doesn't depend on the order releases come in, so re-running a scan keeps the same tracks.
+    """
+
+    def __init__(self, rules, no_filter_artists):
+        words = sorted({word.lower() for word in rules['forbidden_words'] if word}, key=len, reverse=True)
+        self.forbidden_pattern = re.compile('|'.join(re.escape(word) for word in words)) if words else None
+        self.min_duration_ms = rules['min_duration_sec'] * 1000
+        self.max_duration_ms = rules['max_duration_sec'] * 1000
+        self.no_filter_artists = set(no_filter_artists)
+        self.groups = {}  # normalized key -> (rank, uri) of the track kept for that group, lowest rank wins
+        self.seen_uris = set()
+        self.stats = {'kept': 0, 'no_filter': 0, 'forbidden_words': 0, 'duration': 0,
+                      'explicit_replaced_clean': 0, 'duplicates': 0}
+
+    def process(self, tracks, release_date=None):
+        """
+        Filter the tracks of one release, released on `release_date` (YYYY[-MM[-DD]]; None sorts last).
+        Returns (filtered, excluded, replaced) track URIs. `replaced` were returned as filtered earlier
+        and have now lost their group to a preferred version: they belong in excluded instead.
+        """
+        filtered = []
+        excluded = []
+        replaced = []
+        for track in tracks:
+            uri = track['uri']
+            if uri in self.seen_uris:
+                continue
+            self.seen_uris.add(uri)
+            if track['artists'] and track['artists'][0]['id'] in self.no_filter_artists:
+                self.stats['no_filter'] += 1
+                filtered.append(uri)
+                continue
+            if self.forbidden_pattern and self.forbidden_pattern.search(track['name'].lower()):
+                self.stats['forbidden_words'] += 1
+                excluded.append(uri)
+                continue
+            if not self.min_duration_ms <= track['duration_ms'] <= self.max_duration_ms:
+                self.stats['duration'] += 1
+                excluded.append(uri)
+                continue
+            key = get_normalized_key(track)
+            explicit = track.get('explicit', False)
+            rank = (not explicit, release_date or '9999', uri)
+            kept = self.groups.get(key)
+            if kept is None:
+                self.groups[key] = (rank, uri)
+                self.stats['kept'] += 1
+                filtered.append(uri)
+            elif rank < kept[0]:
+                kept_rank, kept_uri = kept
+                self.groups[key] = (rank, uri)
+                self.stats['explicit_replaced_clean' if explicit and kept_rank[0] else 'duplicates'] += 1
+                filtered.append(uri)
+                if kept_uri in filtered:
+                    filtered.remove(kept_uri)
+                    excluded.append(kept_uri)
+                else:
+                    replaced.append(kept_uri)
+            else:
+                self.stats['duplicates'] += 1
+                excluded.append(uri)
+        return filtered, excluded, replaced
+
+    def log_summary(self):
+        stats = self.stats
+        filtered_count = stats['kept'] + stats['no_filter']
+        excluded_count = (stats['forbidden_words'] + stats['duration'] + stats['explicit_replaced_clean']
+                          + stats['duplicates'])
+        print(f"Filtered tracks count: {filtered_count}")
+        print(f"Excluded tracks count: {excluded_count}")
+        log_message(f"Filtered tracks count: {filtered_count} ({stats['no_filter']} from no-filter artists)")
+        log_message(f"Excluded tracks count: {excluded_count} (forbidden words: {stats['forbidden_words']}, "
+                    f"duration: {stats['duration']}, clean replaced by explicit: {stats['explicit_replaced_clean']}, "
+                    f"duplicate versions: {stats['duplicates']})")
+
+
+def create_playlist(sp, user_id, name):
+    try:
+        playlist = spotify_call(sp.user_playlist_create, user_id, name, public=True, idempotent=False)
+        return playlist['id']
+    except SpotifyException as e:
+        log_message(f"SpotifyException occurred while creating playlist: {e}")
+        return None
+    except Exception as e:
+        log_message(f"Error creating playlist: {e}")
+        return None
+
+
+def get_user_playlists(sp, user_id):
+    """Page through the playlists the current user follows and return the ones they own."""
+    playlists = []
+    offset = 0
+    while True:
+        page = spotify_call(sp.current_user_playlists, limit=50, offset=offset)
+        playlists.extend(playlist for playlist in page['items'] if playlist and playlist['owner']['id'] == user_id)
+        if not page.get('next'):
+            return playlists
+        offset += len(page['items'])
+
+
+def playlist_part_name(name, part):
+    return name if part == 1 else f"{name} ({part})"
+
+
+def find_playlist(playlists, name):
+    """Return (playlist, part) for the latest part of the playlist `name` in `playlists`, or (None, 1)."""
+    pattern = re.compile(rf"{re.escape(name)}(?: \((\d+)\))?")
+    found, found_part = None, 1
+    for playlist in playlists:
+        match = pattern.fullmatch(playlist['name'])
+        if match and (found is None or int(match.group(1) or 1) > found_part):
+            found, found_part = playlist, int(match.group(1) or 1)
+    return found, found_part
+
+
+def get_playlist_uris(sp, playlist_id):
+    uris = []
+    offset = 0
+    while True:
+        page = spotify_call(sp.playlist_items, playlist_id, fields='items(track(uri)),next',
+                            limit=PLAYLIST_CHUNK_SIZE, offset=offset)
+        uris.extend(item['track']['uri'] for item in page['items'] if item.get('track'))
+        if not page.get('next'):
+            return uris
+        offset += len(page['items'])
+
+
+def open_playlist(sp, user_id, name, playlists, update=True):
+    """
+    Return (playlist_id, snapshot_id, uris already in the playlist, part, uris in the previous part) for the
+    playlist `name`.
+    `playlists` are the user's own playlists from get_user_playlists. Deleting a playlist on Spotify only
+    unfollows it, so an ID stored in PLAYLIST_CACHE is only reused while it is still among them.
+    In update mode the latest part of an existing playlist is reused, and its tracks are only read when its
+    snapshot_id differs from the cached one. A new playlist is created if none exists or update is off.
+    Returns (None, None, set(), 1, set()) on failure.
+    """
+    if update:
+        with CACHE_LOCK:
+            cached = PLAYLIST_CACHE.get(name)
+        try:
+            followed = {playlist['id']: playlist for playlist in playlists}
+            if cached and cached['id'] in followed:
+                playlist, part = followed[cached['id']], cached.get('part', 1)
+            else:
+                if cached:
+                    log_message(f"Stored playlist {name} ({cached['id']}) was deleted, looking it up by name")
+                playlist, part = find_playlist(playlists, name)
+            if playlist:
+                playlist_id, snapshot_id = playlist['id'], playlist['snapshot_id']
+                if cached and cached['id'] == playlist_id and cached['snapshot_id'] == snapshot_id:
+                    uris = cached['uris']
+                else:
+                    uris = get_playlist_uris(sp, playlist_id)
+                if cached and cached['id'] == playlist_id and 'previous_uris' in cached:
+                    previous_uris = cached['previous_uris']
+                else:
+                    previous_name = playlist_part_name(name, part - 1) if part > 1 else None
+                    previous = next((p for p in playlists if p['name'] == previous_name), None)
+                    previous_uris = get_playlist_uris(sp, previous['id']) if previous else []
+                cache_playlist(name, playlist_id, snapshot_id, uris, part, previous_uris)
+                log_message(f"Updating existing playlist {playlist['name']} ({len(uris)} tracks)")
+                return playlist_id, snapshot_id, set(uris), part, set(previous_uris)
+        except Exception as e:
+            log_message(f"Error reading playlist {name}: {e}")
+            return None, None, set(), 1, set()
+
+    playlist_id = create_playlist(sp, user_id, name)
+    if not playlist_id:
+        return None, None, set(), 1, set()
+    log_message(f"Playlist created: {name}")
+    return playlist_id, None, set(), 1, set()
+
+
+def add_tracks_to_playlist(sp, playlist_id, tracks):
+    """Add `tracks` in chunks of PLAYLIST_CHUNK_SIZE. Returns (tracks added, snapshot_id after the last chunk)."""
+    added = 0
+    snapshot_id = None
+    for i in range(0, len(tracks), PLAYLIST_CHUNK_SIZE):
+        chunk = tracks[i:i + PLAYLIST_CHUNK_SIZE]
+        try:
+            snapshot_id = spotify_call(sp.playlist_add_items, playlist_id, chunk, idempotent=False)['snapshot_id']
+            log_message(f"Added {len(chunk)} tracks to playlist {playlist_id}")
+            added += len(chunk)
+        except SpotifyException as e:
+            log_message(f"SpotifyException occurred while adding tracks to playlist {playlist_id}: {e}")
+            break
+        except Exception as e:
+            log_message(f"Error adding tracks to playlist {playlist_id}: {e}")
+            return added, None
+    return added, snapshot_id
+
+
+def remove_tracks_from_playlist(sp, playlist_id, tracks):
+    """Remove all occurrences of `tracks`. Returns (tracks removed, snapshot_id after the last chunk)."""
+    removed = 0
+    snapshot_id = None
+    for i in range(0, len(tracks), PLAYLIST_CHUNK_SIZE):
+        chunk = tracks[i:i + PLAYLIST_CHUNK_SIZE]
+        try:
+            snapshot_id = spotify_call(sp.playlist_remove_all_occurrences_of_items, playlist_id, chunk)['snapshot_id']
+            log_message(f"Removed {len(chunk)} tracks from playlist {playlist_id}")
+            removed += len(chunk)
+        except SpotifyException as e:
+            log_message(f"SpotifyException occurred while removing tracks from playlist {playlist_id}: {e}")
+            break
+        except Exception as e:
+            log_message(f"Error removing tracks from playlist {playlist_id}: {e}")
+            return removed, None
+    return removed, snapshot_id
+
+
+def fetch_album_batch(sp, album_ids):
+    """
+    Fetch the tracks of up to ALBUM_BATCH_SIZE albums with a single sp.albums call and store them in TRACK_CACHE.
+    """
+    fetched = {}
+    try:
+        albums_data = spotify_call(sp.albums, album_ids)
+        for album in albums_data['albums']:
+            if album and 'id' in album:
+                aid = album['id']
+                if 'tracks' in album and album['tracks']['items']:
+                    fetched[aid] = [slim_track(track) for track in album['tracks']['items']]
+                else:
+                    fetched[aid] = []
+        with CACHE_LOCK:
+            TRACK_CACHE.update(fetched)
+        mark_cache_updated()
+    except SpotifyException as e:
+        log_message(f"SpotifyException in batch fetch of albums {album_ids}: {e}")
+    except Exception as e:
+        log_message(f"Error in batch fetch of albums {album_ids}: {e}")
+    return fetched
+
+
+def get_new_releases(sp, artist_id, start_date, end_date):
+    new_releases = []
+    try:
+        releases = get_artist_albums(sp, artist_id)
+        for album in releases:
+            try:
+                release_date = datetime.datetime.strptime(album['release_date'], '%Y-%m-%d').date()
+                if start_date <= release_date <= end_date:
+                    new_releases.append(album)
+            except ValueError:
+                log_message(f"Ignoring album '{album['name']}' with incomplete release date: {album['release_date']}")
+                continue
+    except Exception as e:
+        log_message(f"Error fetching new releases for artist {artist_id}: {e}")
+    return new_releases
+
+
+def find_artist_releases(sp, artist, exclusion_artists, start_date, end_date):
+    """
+    Release detection for a single artist.
+    Returns the artist's releases within the date range.
+    """
+    artist_id = artist['id']
+    if artist_id in exclusion_artists:
+        return []
+    log_message(f"Processing artist: {artist['name']}")
+    new_releases = get_new_releases(sp, artist_id, start_date, end_date)
+    for release in new_releases:
+        log_message(f"Found new release: {release['name']} by {artist['name']} on {release['release_date']}")
+    return new_releases
+
+
+# --- Scan Pipeline ---
+# save_new_releases_to_playlist runs the scan as a chain of stages connected by bounded queues:
+#   artists -> detect_releases_stage -> fetch_tracks_stage -> filter_stage -> playlist_writer (x2)
+# Each stage passes END_OF_STREAM on when its input is exhausted, so memory stays bounded and
+# tracks reach Spotify while the scan is still running. Playlist writers receive (action, uri)
+# items, where action is ADD_TRACK or REMOVE_TRACK.
+END_OF_STREAM = None
+ADD_TRACK = 'add'
+REMOVE_TRACK = 'remove'
+
+
+def detect_releases_stage(sp, artists_list, exclusion_artists, start_date, end_date, release_queue, progress):
+    """
+    Stage 1: find each artist's new releases concurrently and pass them on as (artist, releases).
+    """
+    def detect(artist):
+        releases = find_artist_releases(sp, artist, exclusion_artists, start_date, end_date)
+        progress.increment('artists_done')
+        if releases:
+            progress.increment('releases_found', len(releases))
+            release_queue.put((artist, releases))
+
+    try:
+        # SCHEDULER decides how many of these workers may call Spotify at the same time
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for future in as_completed([executor.submit(detect, artist) for artist in artists_list]):
+                try:
+                    future.result()
+                except Exception as e:
+                    log_message(f"Error detecting new releases: {e}")
+    finally:
+        release_queue.put(END_OF_STREAM)
+
+
+def fetch_tracks_stage(sp, release_queue, track_queue):
+    """
+    Stage 2: de-duplicate releases across artists and fetch their tracks in full ALBUM_BATCH_SIZE batches.
+    Cached albums are passed on right away. Every release reaches track_queue once, as (release, tracks).
+    """
+    seen = set()
+    pending = []
+    in_flight = threading.BoundedSemaphore(MAX_WORKERS * 2)
+
+    def fetch(batch):
+        try:
+            fetched = fetch_album_batch(sp, [release['id'] for release in batch])
+            for release in batch:
+                if release['id'] in fetched:
+                    track_queue.put((release, fetched[release['id']]))
+                else:
+                    log_message(f"No tracks fetched for release {release['name']}")
+        finally:
+            in_flight.release()
+
+    def submit(executor, batch):
+        in_flight.acquire()
+        executor.submit(fetch, batch)
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            while True:
+                item = release_queue.get()
+                if item is END_OF_STREAM:
+                    break
+                artist, releases = item
+                try:
+                    for release in releases:
+                        if release['id'] in seen:
+                            continue
+                        seen.add(release['id'])
+                        tracks = get_cached_album_tracks(release['id'])
+                        if tracks is not None:
+                            track_queue.put((release, tracks))
+                            continue
+                        pending.append(release)
+                        if len(pending) == ALBUM_BATCH_SIZE:
+                            submit(executor, pending)
+                            pending = []
+                except Exception as e:
+                    log_message(f"Error queuing releases of {artist['name']}: {e}")
+            if pending:
+                submit(executor, pending)
+    finally:
+        track_queue.put(END_OF_STREAM)
+
+
+def filter_stage(track_queue, track_filter, playlist_queue, exclusion_queue, progress):
+    """
+    Stage 3: run each release's tracks through the scan's TrackFilter and route the URIs to the two
+    playlist writers. A track that loses its group to a preferred version (see TrackFilter) is moved from
+    the main playlist to the exclusion one.
+    """
+    try:
+        while True:
+            item = track_queue.get()
+            if item is END_OF_STREAM:
+                break
+            release, tracks = item
+            try:
+                f_tracks, e_tracks, replaced = track_filter.process(tracks, release.get('release_date'))
+                for uri in replaced:
+                    playlist_queue.put((REMOVE_TRACK, uri))
+                for uri in f_tracks:
+                    playlist_queue.put((ADD_TRACK, uri))
+                for uri in e_tracks + replaced:
+                    exclusion_queue.put((ADD_TRACK, uri))
+                progress.increment('tracks_filtered', len(f_tracks) - len(replaced))
+                progress.increment('tracks_excluded', len(e_tracks) + len(replaced))
+            except Exception as e:
+                log_message(f"Error processing tracks for release {release['name']}: {e}")
+    finally:
+        playlist_queue.put(END_OF_STREAM)
+        exclusion_queue.put(END_OF_STREAM)
+
+
+def playlist_writer(sp, user_id, name, uri_queue, results, playlists, update=True):
+    """
+    Stage 4: add tracks to the playlist `name` in chunks of PLAYLIST_CHUNK_SIZE as soon as a chunk is full.
+    The playlist is opened (see open_playlist) when the first track arrives, and tracks it already contains
+    are skipped, so re-running a scan only adds what is missing. Removals are dropped from the pending chunk,
+    or sent along with the next flush if the track is already in the playlist. Once a chunk would take the
+    playlist past PLAYLIST_MAX_TRACKS the rest goes to a new part, "<name> (2)", "<name> (3)"...
+    Tracks in the previous part are skipped too, older parts are not checked.
+    Stores the net number of tracks added in results[name].
+    """
+    playlist_id = None
+    snapshot_id = None
+    part = 1
+    existing = set()
+    previous = set()  # Tracks in the previous, full part
+    opened = False
+    failed = False
+    buffer = []
+    removals = []
+    added = 0
+    skipped = 0
+    while True:
+        item = uri_queue.get()
+        if item is not END_OF_STREAM:
+            action, uri = item
+            if not opened and action == ADD_TRACK:
+                playlist_id, snapshot_id, existing, part, previous = open_playlist(sp, user_id, name, playlists,
+                                                                                   update)
+                opened = True
+            if action == REMOVE_TRACK:
+                if uri in buffer:
+                    buffer.remove(uri)
+                elif uri in existing:
+                    existing.discard(uri)
+                    removals.append(uri)
+            elif uri in existing or uri in previous:
+                skipped += 1
+            elif uri not in buffer:
+                buffer.append(uri)
+        if len(buffer) >= PLAYLIST_CHUNK_SIZE or (item is END_OF_STREAM and (buffer or removals)):
+            try:
+                if playlist_id and removals:
+                    count, new_snapshot_id = remove_tracks_from_playlist(sp, playlist_id, removals)
+                    added -= count
+                    failed = failed or new_snapshot_id is None
+                    snapshot_id = new_snapshot_id or snapshot_id
+                if playlist_id and buffer and len(existing) + len(buffer) > PLAYLIST_MAX_TRACKS:
+                    part_name = playlist_part_name(name, part + 1)
+                    log_message(f"Playlist {playlist_part_name(name, part)} is full, continuing in {part_name}")
+                    playlist_id = create_playlist(sp, user_id, part_name)
+                    part += 1
+                    previous = existing
+                    existing = set()
+                    snapshot_id = None
+                    failed = False
+                if playlist_id and buffer:
+                    count, new_snapshot_id = add_tracks_to_playlist(sp, playlist_id, buffer)
+                    added += count
+                    existing.update(buffer[:count])
+                    failed = failed or new_snapshot_id is None
+                    snapshot_id = new_snapshot_id or snapshot_id
+                if not playlist_id and buffer:
+                    log_message(f"Dropping {len(buffer)} tracks, playlist {name} could not be written")
+            except Exception as e:
+                log_message(f"Error writing tracks to playlist {name}: {e}")
+                failed = True
+            buffer = []
+            removals = []
+        if item is END_OF_STREAM:
+            break
+    if playlist_id:
+        # After a failed write the playlist's contents are unknown, so it is read again next time
+        cache_playlist(name, playlist_id, None if failed else snapshot_id, existing, part, previous)
+    if skipped:
+        log_message(f"Skipped {skipped} tracks already in playlist {name}")
+    results[name] = added
+
+
+def save_new_releases_to_playlist(sp, start_date=None, end_date=None, artist_range=None, progress=None,
+                                  update_playlist=True):
+    """
+    Scan the followed artists for releases between start_date and end_date and write the tracks that pass the
+    filter to a dated playlist, and the excluded ones to the "Exclusion Songs" playlist. With update_playlist
+    an existing dated playlist is topped up instead of creating another one. "Exclusion Songs" is always reused.
+    """
+    today = datetime.date.today()
+    # If dates are not provided, default to last 7 days.
+    if not start_date or not end_date:
+        start_date = today - datetime.timedelta(days=7)
+        end_date = today
+
+    log_message(f"Searching for new releases between {start_date} and {end_date}")
+    progress = progress or ScanProgress()
+    progress.start()
+    load_cache()
+    user_id = spotify_call(sp.current_user)['id']
+    playlists = get_user_playlists(sp, user_id)
+    artists = load_artists_from_file(ARTISTS_FILE)
+    exclusion_artists = set(load_ids_from_file(EXCLUSION_FILE))
+    no_filter_artists = load_ids_from_file(NO_FILTER_FILE)
+    track_filter = TrackFilter(load_filter_rules(FILTER_RULES_FILE), no_filter_artists)
+
+    if artist_range:
+        start, end = artist_range
+        artists = dict(list(artists.items())[start - 1:end])
+    else:
+        artists = artists
+
+    artists_list = list(artists.values())
+    progress.set('artists_total', len(artists_list))
+    playlist_name = f"New Releases {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
+    excluded_playlist_name = "Exclusion Songs"
+    release_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    track_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    playlist_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    exclusion_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    added = {}
+    stages = [
+        threading.Thread(target=fetch_tracks_stage, args=(sp, release_queue, track_queue), daemon=True),
+        threading.Thread(target=filter_stage,
+                         args=(track_queue, track_filter, playlist_queue, exclusion_queue, progress), daemon=True),
+        threading.Thread(target=playlist_writer,
+                         args=(sp, user_id, playlist_name, playlist_queue, added, playlists, update_playlist),
+                         daemon=True),
+        threading.Thread(target=playlist_writer,
+                         args=(sp, user_id, excluded_playlist_name, exclusion_queue, added, playlists), daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+    try:
+        detect_releases_stage(sp, artists_list, exclusion_artists, start_date, end_date, release_queue, progress)
+        for stage in stages:
+            stage.join()
+    finally:
+        save_cache()
+
+    track_filter.log_summary()
+    for name in (playlist_name, excluded_playlist_name):
+        if added.get(name):
+            log_message(f"Added {added[name]} tracks to playlist {name}")
+    log_message(f"Scan progress: {progress.snapshot()}")
+    log_message(f"Spotify requests: {SCHEDULER.snapshot()}")
+    log_message(f"Search completed for the period {start_date} to {end_date}")
+
+
+# --- Background Scan Jobs ---
+# Scans run in the background so the web request returns right away. They share SCHEDULER and write to the
+# same playlists, so JOB_EXECUTOR runs them one at a time.
+JOBS = {}
+JOBS_LOCK = threading.Lock()
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+JOB_STATUS_TEXT = {
+    'queued': "העדכון ממתין בתור...",
+    'syncing': "מעדכן את רשימת האמנים...",
+    'running': "העדכון רץ...",
+}
+
+
+def run_scan_job(job, update_artists, start_date, end_date, artist_range, update_playlist=True):
+    try:
+        sp = get_spotify_client()
+        # Update artist list if requested, or if the file is missing, empty or unreadable
+        artists_file_info = get_artists_file_info()
+        if update_artists or artists_file_info is None or artists_file_info[1] == 0:
+            if not update_artists:
+                log_message("No artists found, updating artist list...")
+            job['status'] = 'syncing'
+            check_for_artist_changes(sp)
+
+        # Run the main logic
+        job['status'] = 'running'
+        save_new_releases_to_playlist(sp, start_date, end_date, artist_range, progress=job['progress'],
+                                      update_playlist=update_playlist)
+        job['result'] = f"סיימנו עדכון לתאריכים {start_date} עד {end_date}."
+        job['status'] = 'done'
+    except Exception as e:
+        log_message(f"Scan job {job['id']} failed: {e}")
+        job['result'] = f"שגיאה התרחשה: {e}"
+        job['status'] = 'failed'
+    job['finished_at'] = time.time()
+
+
+def submit_scan_job(update_artists, start_date, end_date, artist_range, update_playlist=True):
+    job = {
+        'id': uuid.uuid4().hex[:8],
+        'status': 'queued',
+        'params': {'start_date': str(start_date), 'end_date': str(end_date), 'artist_range': artist_range,
+                   'update_artists': update_artists, 'update_playlist': update_playlist},
+        'progress': ScanProgress(),
+        'result': "",
+        'submitted_at': time.time(),
+        'finished_at': None,
+    }
+    with JOBS_LOCK:
+        JOBS[job['id']] = job
+        finished = [job_id for job_id, j in JOBS.items() if j['finished_at']]
+        for job_id in finished[:-MAX_KEPT_JOBS]:
+            del JOBS[job_id]
+    JOB_EXECUTOR.submit(run_scan_job, job, update_artists, start_date, end_date, artist_range, update_playlist)
+    log_message(f"Scan job {job['id']} submitted: {job['params']}")
+    return job['id']
+
+
+def get_job(job_id):
+    with JOBS_LOCK:
+        if job_id:
+            return JOBS.get(job_id)
+        return next(reversed(JOBS.values()), None)
+
+
+def job_status(job):
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'params': job['params'],
+        'progress': job['progress'].snapshot(),
+        'result': job['result'] or JOB_STATUS_TEXT.get(job['status'], ""),
+        'submitted_at': job['submitted_at'],
+        'finished_at': job['finished_at'],
+    }
+
+
+def read_log_tail(offset):
+    """
+    Read new log output starting at byte `offset`, up to LOG_TAIL_BYTES and ending on a full line.
+    A negative offset starts from the last LOG_TAIL_BYTES of the file. Returns (data, new offset, reset);
+    reset is True when the file was rotated since `offset` and the tail starts over.
+    """
+    if not os.path.exists(LOG_FILENAME):
+        return "", 0, offset > 0
+    size = os.path.getsize(LOG_FILENAME)
+    reset = offset > size
+    if reset:
+        offset = 0
+    start = max(0, size - LOG_TAIL_BYTES) if offset < 0 else offset
+    with open(LOG_FILENAME, 'rb') as f:
+        f.seek(start)
+        chunk = f.read(LOG_TAIL_BYTES)
+    if offset < 0 and start > 0:
+        # Starting mid-file: skip the partial first line
+        skip = chunk.find(b'\n') + 1
+        start += skip
+        chunk = chunk[skip:]
+    end = chunk.rfind(b'\n') + 1
+    if end or len(chunk) < LOG_TAIL_BYTES:
+        # Stop at the last full line; a single line longer than LOG_TAIL_BYTES is sent in pieces
+        chunk = chunk[:end]
+    return chunk.decode('utf-8', errors='replace'), start + len(chunk), reset
+
+
+# --- Flask Web Interface ---
+app = Flask(__name__)
+
+
+@app.route('/', methods=['GET', 'POST'])
+def index():
+    result = ""
+    last_modified_info = ""
+    artist_count_info = ""
+
+    # Load basic info about ARTISTS_FILE
+    artists_file_info = get_artists_file_info()
+    if artists_file_info:
+        last_synced_time, num_artists = artists_file_info
+        last_synced_date = datetime.date.fromtimestamp(last_synced_time).strftime('%d.%m.%Y')
+        days_since_last_sync = (datetime.date.today() - datetime.date.fromtimestamp(last_synced_time)).days
+        last_modified_info = f"רשימת האמנים סונכרנה לאחרונה בתאריך {last_synced_date}, לפני {days_since_last_sync} ימים."
+        artist_count_info = f"מספר האמנים בקובץ: {num_artists}"
+    else:
+        last_modified_info = "טרם נוצר קובץ אמנים."
+        artist_count_info = "מספר האמנים בקובץ: 0"
+
+    if request.method == 'POST':
+        # Read form inputs
+        update_artists = request.form.get('update_artists', 'no')
+        update_playlist = request.form.get('update_playlist', 'yes')
+        date_option = request.form.get('date_option', 'last7')
+        artist_range_str = request.form.get('artist_range', '')
+        days_back_str = request.form.get('days_back', '')
+        custom_start_str = request.form.get('custom_start', '')
+        custom_end_str = request.form.get('custom_end', '')
+
+        today = datetime.date.today()
+
+        # Choose date range
+        if date_option == 'lastX':
+            try:
+                days_back = int(days_back_str)
+            except ValueError:
+                days_back = 7
+            start_date = today - datetime.timedelta(days=days_back)
+            end_date = today
+        elif date_option == 'lastWeek':
+            start_date = today - datetime.timedelta(days=today.weekday() + 1)
+            end_date = start_date + datetime.timedelta(days=6)
+        elif date_option == 'custom':
+            try:
+                start_date = datetime.date.fromisoformat(custom_start_str)
+                end_date = datetime.date.fromisoformat(custom_end_str)
+            except ValueError:
+                # ברירת מחדל
+                start_date = today - datetime.timedelta(days=7)
+                end_date = today
+        else:
+            # ברירת מחדל
+            start_date = today - datetime.timedelta(days=7)
+            end_date = today
+
+        # Process artist range input
+        artist_range = None
+        if artist_range_str:
+            try:
+                parts = artist_range_str.split('-')
+                if len(parts) == 2:
+                    artist_range = (int(parts[0].strip()), int(parts[1].strip()))
+            except:
+                artist_range = None
+
+        job_id = submit_scan_job(update_artists.lower() == 'yes', start_date, end_date, artist_range,
+                                 update_playlist.lower() == 'yes')
+        # Redirect so that refreshing the page follows the job instead of submitting another one
+        return redirect(f"/?job={job_id}")
+
+    job = get_job(request.args.get('job'))
+    job_id = ""
+    if job:
+        job_id = job['id']
+        result = job_status(job)['result']
+
+    return f"""
+    <html>
+      <head>
+         <title>Spotify New Releases Update</title>
+         <meta charset="utf-8">
+         <style>
+           body {{
+               font-family: "Segoe UI", Tahoma, Geneva, Verdana, sans-serif;
+               margin: 20px; 
+               background: #f4f4f4;
+           }}
+           h1, h2, h3, h4 {{
+               font-weight: 600;
+           }}
+           .container {{
+               max-width: 800px;
+               margin: 0 auto;
+               background: #fff;
+               padding: 20px;
+               box-shadow: 0 0 10px rgba(0,0,0,0.1);
+           }}
+           label {{
+               display: inline-block;
+               margin-top: 10px;
+               font-weight: 600;
+           }}
+           input[type="text"], input[type="number"], input[type="date"], select {{
+               width: 250px;
+               padding: 8px;
+               margin-top: 5px;
+               border: 1px solid #ccc;
+               border-radius: 4px;
+           }}
+           .radio-group {{
+               margin: 10px 0;
+           }}
+           .radio-group label {{
+               margin-right: 15px;
+               font-weight: normal;
+           }}
+           input[type="radio"] {{
+               margin-right: 5px;
+           }}
+           .button {{
+               background-color: #007bff;
+               color: white;
+               padding: 10px 20px;
+               border: none;
+               border-radius: 4px;
+               cursor: pointer;
+               margin-top: 20px;
+           }}
+           .button:hover {{
+               background-color: #0056b3;
+           }}
+           textarea {{
+               width: 100%;
+               height: 300px;
+               margin-top: 10px;
+               border: 1px solid #ccc;
+               border-radius: 4px;
+               padding: 10px;
+               font-family: monospace;
+               font-size: 0.9em;
+           }}
+           .info-box {{
+               background: #e9ecef;
+               padding: 10px;
+               margin-bottom: 15px;
+               border-radius: 4px;
+           }}
+           .progress td {{
+               padding: 2px 10px;
+           }}
+         </style>
+      </head>
+      <body>
+        <div class="container">
+          <h1>Spotify New Releases Update</h1>
+
+          <div class="info-box">
+             <strong>{last_modified_info}</strong><br>
+             <strong>{artist_count_info}</strong>
+          </div>
+
+          <form method="post">
+            <div class="radio-group">
+              <label>לעדכן את רשימת האמנים?</label><br>
+              <label><input type="radio" name="update_artists" value="yes">כן</label>
+              <label><input type="radio" name="update_artists" value="no" checked>לא</label>
+            </div>
+
+            <div class="radio-group">
+              <label>לעדכן פלייליסט קיים לאותם תאריכים?</label><br>
+              <label><input type="radio" name="update_playlist" value="yes" checked>כן</label>
+              <label><input type="radio" name="update_playlist" value="no">לא (פלייליסט חדש)</label>
+            </div>
+
+            <label>טווח אמנים (לדוגמה 300-400):</label><br>
+            <input type="text" name="artist_range" placeholder="Optional">
+
+            <h3>בחירת טווח תאריכים:</h3>
+            <div class="radio-group">
+              <label><input type="radio" name="date_option" value="lastX" checked> אחרון X ימים</label><br>
+              <label><input type="radio" name="date_option" value="lastWeek"> השבוע האחרון (ראשון-שבת)</label><br>
+              <label><input type="radio" name="date_option" value="custom"> מותאם (YYYY-MM-DD)</label>
+            </div>
+
+            <label>מספר ימים (לאפשרות 'אחרון X ימים'):</label><br>
+            <input type="number" name="days_back" value="7"><br>
+
+            <label>תאריך התחלה (לאפשרות 'מותאם'):</label><br>
+            <input type="date" name="custom_start" placeholder="YYYY-MM-DD"><br>
+
+            <label>תאריך סיום (לאפשרות 'מותאם'):</label><br>
+            <input type="date" name="custom_end" placeholder="YYYY-MM-DD"><br>
+
+            <input type="submit" class="button" value="Run Update">
+          </form>
+
+          <h2>תוצאה:</h2>
+          <p id="job-result">{result if result else "לא בוצע עדכון."}</p>
+          <table class="progress" id="job-progress" style="display: none">
+            <tr><td>אמנים שנסרקו</td><td id="artists"></td></tr>
+            <tr><td>שחרורים חדשים</td><td id="releases_found"></td></tr>
+            <tr><td>שירים לפלייליסט / לפלייליסט ההחרגות</td><td id="tracks"></td></tr>
+            <tr><td>קריאות API (ניסיונות חוזרים)</td><td id="api_calls"></td></tr>
+            <tr><td>המתנות 429</td><td id="throttled"></td></tr>
+          </table>
+
+          <h2>Log Output:</h2>
+          <textarea readonly id="logs"></textarea>
+        </div>
+        <script>
+          const jobId = "{job_id}";
+          const logBox = document.getElementById('logs');
+          let logOffset = -1;
+
+          function pollLogs() {{
+            fetch('/logs?offset=' + logOffset)
+              .then(response => response.json())
+              .then(tail => {{
+                if (tail.reset) {{
+                  logBox.value = '';
+                }}
+                if (tail.data) {{
+                  // Keep the textarea small however long the scan runs
+                  logBox.value = (logBox.value + tail.data).slice(-200000);
+                  logBox.scrollTop = logBox.scrollHeight;
+                }}
+                logOffset = tail.offset;
+              }})
+              .finally(() => setTimeout(pollLogs, 2000));
+          }}
+
+          function showJob(job) {{
+            const p = job.progress;
+            document.getElementById('job-result').textContent = job.result;
+            document.getElementById('job-progress').style.display = '';
+            document.getElementById('artists').textContent = p.artists_done + ' / ' + p.artists_total;
+            document.getElementById('releases_found').textContent = p.releases_found;
+            document.getElementById('tracks').textContent = p.tracks_filtered + ' / ' + p.tracks_excluded;
+            document.getElementById('api_calls').textContent = p.api_calls + ' (' + p.retries + ')';
+            document.getElementById('throttled').textContent = p.throttled + ' (' + p.throttle_wait + ' שניות)';
+          }}
+
+          pollLogs();
+          if (jobId) {{
+            const events = new EventSource('/jobs/' + jobId + '/events');
+            events.onmessage = event => {{
+              const job = JSON.parse(event.data);
+              showJob(job);
+              if (job.status === 'done' || job.status === 'failed') {{
+                events.close();
+              }}
+            }};
+          }}
+        </script>
+      </body>
+    </html>
+    """
+
+
+@app.route('/jobs/<job_id>')
+def job_info(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': f"Unknown job {job_id}"}), 404
+    return jsonify(job_status(job))
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Server-Sent Events stream of the job's status, sent whenever it changes, until the job has finished.
+    """
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': f"Unknown job {job_id}"}), 404
+
+    def events():
+        last_sent = None
+        while True:
+            status = job_status(job)
+            if status != last_sent:
+                yield f"data: {json.dumps(status, ensure_ascii=False)}\n\n"
+                last_sent = status
+            if status['finished_at']:
+                break
+            time.sleep(1)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
+@app.route('/logs')
+def logs_tail():
+    try:
+        offset = int(request.args.get('offset', -1))
+    except ValueError:
+        offset = -1
+    data, offset, reset = read_log_tail(offset)
+    return jsonify({'data': data, 'offset': offset, 'reset': reset})
+
+
+if __name__ == '__main__':
+    app.run(debug=True, use_reloader=False)